@@ -40,7 +40,7 @@ from .gate import Rx, Ry, Rz, CombinedSingleGate
 from .gate import CNOT, Swap, Rxx, Ryy, Rzz, Rxy, ReconfigurableBeamSplitter, Toffoli, Fredkin
 from .gate import UAnyGate, LatentGate, HamiltonianGate, Barrier
 from .layer import Observable, U3Layer, XLayer, YLayer, ZLayer, HLayer, RxLayer, RyLayer, RzLayer
-from .layer import CnotLayer, CnotRing
+from .layer import CnotLayer, CnotRing, set_compile_layer
 from .qmath import multi_kron, partial_trace, amplitude_encoding, measure, expectation
 from .qmath import meyer_wallach_measure
 from .state import QubitState, MatrixProductState
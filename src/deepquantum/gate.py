@@ -347,12 +347,19 @@ class ParametricSingleGate(SingleGate):
 
     def update_matrix(self) -> torch.Tensor:
         """Update the local unitary matrix."""
+        # skip the rebuild when the parameter has not been modified in place
+        # since the last call and no autograd graph is needed
+        key = (self.theta._version, self.theta.dtype, self.theta.device, self.inv_mode)
+        if key == self._matrix_key and not (self.theta.requires_grad and torch.is_grad_enabled()):
+            return self._matrix_cache
         if self.inv_mode:
             theta = -self.theta
         else:
             theta = self.theta
         matrix = self.get_matrix(theta)
         self.matrix = matrix.detach()
+        self._matrix_cache = self.matrix
+        self._matrix_key = key
         return matrix
 
     def init_para(self, inputs: Any = None) -> None:
@@ -362,6 +369,8 @@ class ParametricSingleGate(SingleGate):
             self.theta = nn.Parameter(theta)
         else:
             self.register_buffer('theta', theta)
+        self._matrix_key = None # a fresh tensor restarts the version counter
+        self._matrix_cache = None
         self.update_matrix()
 
     def inverse(self) -> 'ParametricSingleGate':
@@ -432,12 +441,19 @@ class ParametricDoubleGate(DoubleGate):
 
     def update_matrix(self) -> torch.Tensor:
         """Update the local unitary matrix."""
+        # skip the rebuild when the parameter has not been modified in place
+        # since the last call and no autograd graph is needed
+        key = (self.theta._version, self.theta.dtype, self.theta.device, self.inv_mode)
+        if key == self._matrix_key and not (self.theta.requires_grad and torch.is_grad_enabled()):
+            return self._matrix_cache
         if self.inv_mode:
             theta = -self.theta
         else:
             theta = self.theta
         matrix = self.get_matrix(theta)
         self.matrix = matrix.detach()
+        self._matrix_cache = self.matrix
+        self._matrix_key = key
         return matrix
 
     def init_para(self, inputs: Any = None) -> None:
@@ -447,6 +463,8 @@ class ParametricDoubleGate(DoubleGate):
             self.theta = nn.Parameter(theta)
         else:
             self.register_buffer('theta', theta)
+        self._matrix_key = None # a fresh tensor restarts the version counter
+        self._matrix_cache = None
         self.update_matrix()
 
     def inverse(self) -> 'ParametricDoubleGate':
@@ -543,6 +561,12 @@ class U3Gate(ParametricSingleGate):
 
     def update_matrix(self) -> torch.Tensor:
         """Update the local unitary matrix."""
+        # skip the rebuild when the parameters have not been modified in place
+        # since the last call and no autograd graph is needed
+        key = (self.theta._version, self.phi._version, self.lambd._version,
+               self.theta.dtype, self.theta.device, self.inv_mode)
+        if key == self._matrix_key and not (self.theta.requires_grad and torch.is_grad_enabled()):
+            return self._matrix_cache
         if self.inv_mode:
             theta = -self.theta
             phi   = -self.lambd
@@ -553,6 +577,8 @@ class U3Gate(ParametricSingleGate):
             lambd = self.lambd
         matrix = self.get_matrix(theta, phi, lambd)
         self.matrix = matrix.detach()
+        self._matrix_cache = self.matrix
+        self._matrix_key = key
         return matrix
 
     def init_para(self, inputs: Any = None) -> None:
@@ -566,6 +592,8 @@ class U3Gate(ParametricSingleGate):
             self.register_buffer('theta', theta)
             self.register_buffer('phi', phi)
             self.register_buffer('lambd', lambd)
+        self._matrix_key = None # fresh tensors restart the version counters
+        self._matrix_cache = None
         self.update_matrix()
 
     def extra_repr(self) -> str:
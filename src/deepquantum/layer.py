@@ -2,15 +2,102 @@
 Quantum layers
 """
 
-from copy import deepcopy
-from typing import List, Union, Optional, Any
+from functools import lru_cache
+from typing import List, Tuple, Union, Optional, Any
 
 import torch
-from torch import nn
 
 from .gate import PauliX, PauliY, PauliZ, U3Gate, Hadamard, Rx, Ry, Rz, CNOT
 from .operation import Layer
 from .qmath import multi_kron
+from .state import MatrixProductState
+
+try:
+    import pyfastkron.fastkrontorch as fastkrontorch
+except ImportError:
+    fastkrontorch = None
+
+try:
+    import triton
+    import triton.language as tl
+except ImportError:
+    triton = None
+
+if triton is not None:
+    @triton.jit
+    def _kron2x2_kernel(mat_re_ptr, mat_im_ptr, out_re_ptr, out_im_ptr, dim,
+                        n: tl.constexpr, BLOCK: tl.constexpr):
+        # each program computes BLOCK output elements (i, j) by bit-decomposing
+        # the indices into n 1-bit pairs and multiplying mats[k, i_k, j_k]
+        pid = tl.program_id(axis=0)
+        offs = pid * BLOCK + tl.arange(0, BLOCK)
+        mask = offs < dim * dim
+        i = offs // dim
+        j = offs % dim
+        acc_re = tl.load(mat_re_ptr + ((i >> (n - 1)) & 1) * 2 + ((j >> (n - 1)) & 1), mask=mask)
+        acc_im = tl.load(mat_im_ptr + ((i >> (n - 1)) & 1) * 2 + ((j >> (n - 1)) & 1), mask=mask)
+        for k in range(1, n):
+            shift = n - 1 - k
+            idx = k * 4 + ((i >> shift) & 1) * 2 + ((j >> shift) & 1)
+            m_re = tl.load(mat_re_ptr + idx, mask=mask)
+            m_im = tl.load(mat_im_ptr + idx, mask=mask)
+            new_re = acc_re * m_re - acc_im * m_im
+            acc_im = acc_re * m_im + acc_im * m_re
+            acc_re = new_re
+        tl.store(out_re_ptr + offs, acc_re, mask=mask)
+        tl.store(out_im_ptr + offs, acc_im, mask=mask)
+
+
+def _multi_kron_triton(mats: torch.Tensor) -> torch.Tensor:
+    """Assemble the n-fold Kronecker product of a stack of 2x2 matrices in one fused kernel."""
+    n = mats.shape[0]
+    dim = 2 ** n
+    mat_re = mats.real.contiguous()
+    mat_im = mats.imag.contiguous()
+    out_re = torch.empty(dim * dim, dtype=mat_re.dtype, device=mats.device)
+    out_im = torch.empty(dim * dim, dtype=mat_re.dtype, device=mats.device)
+    block = 1024
+    grid = ((dim * dim + block - 1) // block,)
+    _kron2x2_kernel[grid](mat_re, mat_im, out_re, out_im, dim, n=n, BLOCK=block)
+    return torch.complex(out_re, out_im).reshape(dim, dim)
+
+
+@lru_cache(maxsize=None)
+def _cached_eye(nqubit: int, dtype: torch.dtype, device: torch.device) -> torch.Tensor:
+    """Get a cached identity matrix for ``nqubit`` qubits."""
+    return torch.eye(2 ** nqubit, dtype=dtype, device=device)
+
+
+@lru_cache(maxsize=256)
+def _ring_wires(lo: int, hi: int, step: int, reverse: bool) -> Tuple[Tuple[int, int], ...]:
+    """Get the cached control and target pairs of a CNOT ring."""
+    nwires = hi - lo + 1
+    if reverse: # from hi to lo
+        return tuple((lo + i, lo + (i - step) % nwires) for i in range(hi - lo, -1, -1))
+    else:
+        return tuple((lo + i, lo + (i + step) % nwires) for i in range(hi - lo + 1))
+
+
+# constant local matrices shared by the parameter-free layers, kept in double
+# precision and downcast per use so no precision is baked in at import time
+_MATRIX_X = torch.tensor([[0, 1], [1, 0]], dtype=torch.cdouble)
+_MATRIX_Y = torch.tensor([[0, -1j], [1j, 0]], dtype=torch.cdouble)
+_MATRIX_Z = torch.tensor([[1, 0], [0, -1]], dtype=torch.cdouble)
+_MATRIX_H = torch.tensor([[1, 1], [1, -1]], dtype=torch.cdouble) / 2 ** 0.5
+
+
+_compile_layer = False
+
+
+def set_compile_layer(flag: bool = True) -> None:
+    """Enable or disable ``torch.compile`` for layers created afterwards.
+
+    When enabled, the gate-application loop of ``SingleLayer`` is compiled into
+    a single graph, which removes the per-gate Python and dispatch overhead for
+    long layer chains. Default: ``False``
+    """
+    global _compile_layer
+    _compile_layer = flag
 
 
 class SingleLayer(Layer):
@@ -40,16 +127,79 @@ class SingleLayer(Layer):
         super().__init__(name=name, nqubit=nqubit, wires=wires, den_mat=den_mat, tsr_mode=tsr_mode)
         for wire in self.wires:
             assert len(wire) == 1
+        self._compile_apply_gates()
+
+    def _compile_apply_gates(self) -> None:
+        """Select the gate-application implementation according to the compile flag."""
+        if _compile_layer and hasattr(torch, 'compile'):
+            self._apply_gates_impl = torch.compile(self._apply_gates, dynamic=False)
+        else:
+            self._apply_gates_impl = self._apply_gates
 
-    def get_unitary(self) -> torch.Tensor:
-        """Get the global unitary matrix."""
+    def build_matrices(self) -> torch.Tensor:
+        """Get the stack of local unitary matrices of all gates."""
+        return torch.stack([gate.update_matrix() for gate in self.gates])
+
+    def get_unitary(self, dtype: Optional[torch.dtype] = None) -> torch.Tensor:
+        """Get the global unitary matrix.
+
+        Args:
+            dtype (torch.dtype or None, optional): The data type used to assemble the unitary matrix.
+                Default: ``None`` (which means the dtype of the local matrices)
+        """
         assert len(self.gates) > 0, 'There is no quantum gate'
-        identity = torch.eye(2, dtype=torch.cfloat, device=self.gates[0].matrix.device)
-        lst = [identity] * self.nqubit
-        for gate in self.gates:
-            lst[gate.wires[0]] = gate.update_matrix()
+        matrix = self.gates[0].matrix
+        mats = self.build_matrices()
+        if dtype is None:
+            # resolve from the freshly built matrices, not the stale buffer,
+            # so double-precision parameters yield complex128 identities
+            dtype = mats.dtype
+        mats = mats.to(dtype)
+        matrices = {}
+        for i, gate in enumerate(self.gates):
+            matrices[gate.wires[0]] = mats[i]
+        if (triton is not None and matrix.is_cuda and len(matrices) == self.nqubit
+                and not mats.requires_grad):
+            return _multi_kron_triton(torch.stack([matrices[i] for i in range(self.nqubit)]))
+        # fuse consecutive idle wires into one cached identity instead of
+        # feeding nqubit factors (mostly 2x2 identities) to multi_kron
+        lst = []
+        nidle = 0
+        for i in range(self.nqubit):
+            if i in matrices:
+                if nidle > 0:
+                    lst.append(_cached_eye(nidle, dtype, matrix.device))
+                    nidle = 0
+                lst.append(matrices[i])
+            else:
+                nidle += 1
+        if nidle > 0:
+            lst.append(_cached_eye(nidle, dtype, matrix.device))
+        if fastkrontorch is not None and len(lst) > 3:
+            identity = _cached_eye(self.nqubit, dtype, matrix.device)
+            return fastkrontorch.gemkm(identity, lst)
         return multi_kron(lst)
 
+    def _apply_gates(self, x: torch.Tensor) -> torch.Tensor:
+        # contract each 2x2 matrix with its wire axis directly instead of
+        # permuting and reshaping the state per gate
+        mats = self.build_matrices()
+        for i, gate in enumerate(self.gates):
+            wire = gate.wires[0] + 1
+            x = torch.tensordot(mats[i], x, dims=([1], [wire])).movedim(0, wire)
+        return x
+
+    def forward(self, x: Union[torch.Tensor, MatrixProductState]) -> Union[torch.Tensor, MatrixProductState]:
+        """Perform a forward pass."""
+        if isinstance(x, MatrixProductState) or self.den_mat or any(gate.controls for gate in self.gates):
+            return super().forward(x)
+        if not self.tsr_mode:
+            x = self.tensor_rep(x)
+        x = self._apply_gates_impl(x)
+        if not self.tsr_mode:
+            return self.vector_rep(x).squeeze(0)
+        return x
+
 
 class DoubleLayer(Layer):
     r"""A base class for layers of two-qubit gates.
@@ -120,6 +270,38 @@ class Observable(SingleLayer):
             else:
                 raise ValueError('Use illegal measurement basis')
             self.gates.append(gate)
+        # the Pauli matrices are constant, so stack them once instead of
+        # collecting them gate by gate in every forward pass
+        self.register_buffer('_pauli_stack', torch.stack([gate.matrix for gate in self.gates]),
+                             persistent=False)
+
+    def build_matrices(self) -> torch.Tensor:
+        """Get the stack of local unitary matrices of all gates."""
+        return self._pauli_stack
+
+    def get_unitary_diag(self) -> torch.Tensor:
+        """Get the diagonal of the global unitary matrix for an all-``'z'`` observable.
+
+        A Pauli-Z string is diagonal in the computational basis, so the whole observable
+        is described by a :math:`2^n` vector of :math:`\\pm 1` signs (``int8``) instead of
+        a dense :math:`2^n \\times 2^n` matrix. The sign of a basis state is the parity
+        of its bits on the measured wires.
+        """
+        assert set(self.basis) == {'z'}, 'Only an all-z observable is diagonal'
+        device = self.gates[0].matrix.device
+        index = torch.arange(2 ** self.nqubit, device=device)
+        parity = torch.zeros_like(index)
+        for wire in self.wires:
+            parity ^= (index >> (self.nqubit - 1 - wire[0])) & 1
+        return (1 - 2 * parity).to(torch.int8)
+
+    def get_unitary(self, dtype: Optional[torch.dtype] = None) -> torch.Tensor:
+        """Get the global unitary matrix. See :meth:`SingleLayer.get_unitary`."""
+        if set(self.basis) == {'z'}:
+            if dtype is None:
+                dtype = self.gates[0].matrix.dtype
+            return torch.diag(self.get_unitary_diag().to(dtype))
+        return super().get_unitary(dtype)
 
 
 class U3Layer(SingleLayer):
@@ -159,14 +341,34 @@ class U3Layer(SingleLayer):
             self.gates.append(u3)
             self.npara += u3.npara
 
+    def build_matrices(self) -> torch.Tensor:
+        """Get the stack of local unitary matrices of all gates."""
+        # gather the angles into an (n, 3) structure-of-arrays tensor so that
+        # all U3 matrices are built with one batch of trigonometric kernels
+        angles = []
+        for gate in self.gates:
+            if gate.inv_mode:
+                angles.append(torch.stack([-gate.theta, -gate.lambd, -gate.phi]))
+            else:
+                angles.append(torch.stack([gate.theta, gate.phi, gate.lambd]))
+        theta, phi, lambd = torch.stack(angles).unbind(-1)
+        cos_t = torch.cos(theta / 2) + 0j
+        sin_t = torch.sin(theta / 2) + 0j
+        e_il  = torch.exp(1j * lambd)
+        e_ip  = torch.exp(1j * phi)
+        return torch.stack([cos_t, -e_il * sin_t, e_ip * sin_t, e_ip * e_il * cos_t],
+                           dim=-1).reshape(-1, 2, 2)
+
     def inverse(self) -> 'U3Layer':
         """Get the inversed layer."""
-        layer = deepcopy(self)
-        gates = nn.Sequential()
+        layer = self.__class__.__new__(self.__class__)
+        Layer.__init__(layer, name=self.name, nqubit=self.nqubit, wires=self.wires[::-1],
+                       den_mat=self.den_mat, tsr_mode=self.tsr_mode)
+        layer._compile_apply_gates()
+        layer.requires_grad = self.requires_grad
         for gate in self.gates[::-1]:
-            gates.append(gate.inverse())
-        layer.gates = gates
-        layer.wires = self.wires[::-1]
+            layer.gates.append(gate.inverse())
+        layer.npara = self.npara
         return layer
 
 
@@ -195,6 +397,10 @@ class XLayer(SingleLayer):
             x = PauliX(nqubit=nqubit, wires=wire, den_mat=den_mat, tsr_mode=True)
             self.gates.append(x)
 
+    def build_matrices(self) -> torch.Tensor:
+        """Get the stack of local unitary matrices of all gates."""
+        return _MATRIX_X.to(self.gates[0].matrix).expand(len(self.gates), 2, 2)
+
 
 class YLayer(SingleLayer):
     r"""A layer of Pauli-Y gates.
@@ -221,6 +427,10 @@ class YLayer(SingleLayer):
             y = PauliY(nqubit=nqubit, wires=wire, den_mat=den_mat, tsr_mode=True)
             self.gates.append(y)
 
+    def build_matrices(self) -> torch.Tensor:
+        """Get the stack of local unitary matrices of all gates."""
+        return _MATRIX_Y.to(self.gates[0].matrix).expand(len(self.gates), 2, 2)
+
 
 class ZLayer(SingleLayer):
     r"""A layer of Pauli-Z gates.
@@ -247,6 +457,10 @@ class ZLayer(SingleLayer):
             z = PauliZ(nqubit=nqubit, wires=wire, den_mat=den_mat, tsr_mode=True)
             self.gates.append(z)
 
+    def build_matrices(self) -> torch.Tensor:
+        """Get the stack of local unitary matrices of all gates."""
+        return _MATRIX_Z.to(self.gates[0].matrix).expand(len(self.gates), 2, 2)
+
 
 class HLayer(SingleLayer):
     r"""A layer of Hadamard gates.
@@ -273,6 +487,10 @@ class HLayer(SingleLayer):
             h = Hadamard(nqubit=nqubit, wires=wire, den_mat=den_mat, tsr_mode=True)
             self.gates.append(h)
 
+    def build_matrices(self) -> torch.Tensor:
+        """Get the stack of local unitary matrices of all gates."""
+        return _MATRIX_H.to(self.gates[0].matrix).expand(len(self.gates), 2, 2)
+
 
 class RxLayer(SingleLayer):
     r"""A layer of Rx gates.
@@ -311,14 +529,23 @@ class RxLayer(SingleLayer):
             self.gates.append(rx)
             self.npara += rx.npara
 
+    def build_matrices(self) -> torch.Tensor:
+        """Get the stack of local unitary matrices of all gates."""
+        thetas = torch.stack([-gate.theta if gate.inv_mode else gate.theta for gate in self.gates])
+        cos  = torch.cos(thetas / 2)
+        isin = torch.sin(thetas / 2) * 1j
+        return torch.stack([cos, -isin, -isin, cos], dim=-1).reshape(-1, 2, 2)
+
     def inverse(self) -> 'RxLayer':
         """Get the inversed layer."""
-        layer = deepcopy(self)
-        gates = nn.Sequential()
+        layer = self.__class__.__new__(self.__class__)
+        Layer.__init__(layer, name=self.name, nqubit=self.nqubit, wires=self.wires[::-1],
+                       den_mat=self.den_mat, tsr_mode=self.tsr_mode)
+        layer._compile_apply_gates()
+        layer.requires_grad = self.requires_grad
         for gate in self.gates[::-1]:
-            gates.append(gate.inverse())
-        layer.gates = gates
-        layer.wires = self.wires[::-1]
+            layer.gates.append(gate.inverse())
+        layer.npara = self.npara
         return layer
 
 
@@ -359,14 +586,23 @@ class RyLayer(SingleLayer):
             self.gates.append(ry)
             self.npara += ry.npara
 
+    def build_matrices(self) -> torch.Tensor:
+        """Get the stack of local unitary matrices of all gates."""
+        thetas = torch.stack([-gate.theta if gate.inv_mode else gate.theta for gate in self.gates])
+        cos = torch.cos(thetas / 2)
+        sin = torch.sin(thetas / 2)
+        return torch.stack([cos, -sin, sin, cos], dim=-1).reshape(-1, 2, 2) + 0j
+
     def inverse(self) -> 'RyLayer':
         """Get the inversed layer."""
-        layer = deepcopy(self)
-        gates = nn.Sequential()
+        layer = self.__class__.__new__(self.__class__)
+        Layer.__init__(layer, name=self.name, nqubit=self.nqubit, wires=self.wires[::-1],
+                       den_mat=self.den_mat, tsr_mode=self.tsr_mode)
+        layer._compile_apply_gates()
+        layer.requires_grad = self.requires_grad
         for gate in self.gates[::-1]:
-            gates.append(gate.inverse())
-        layer.gates = gates
-        layer.wires = self.wires[::-1]
+            layer.gates.append(gate.inverse())
+        layer.npara = self.npara
         return layer
 
 
@@ -407,14 +643,24 @@ class RzLayer(SingleLayer):
             self.gates.append(rz)
             self.npara += rz.npara
 
+    def build_matrices(self) -> torch.Tensor:
+        """Get the stack of local unitary matrices of all gates."""
+        thetas = torch.stack([-gate.theta if gate.inv_mode else gate.theta for gate in self.gates])
+        e_m_it = torch.exp(-1j * thetas / 2)
+        e_it = torch.exp(1j * thetas / 2)
+        zero = torch.zeros_like(e_it)
+        return torch.stack([e_m_it, zero, zero, e_it], dim=-1).reshape(-1, 2, 2)
+
     def inverse(self) -> 'RzLayer':
         """Get the inversed layer."""
-        layer = deepcopy(self)
-        gates = nn.Sequential()
+        layer = self.__class__.__new__(self.__class__)
+        Layer.__init__(layer, name=self.name, nqubit=self.nqubit, wires=self.wires[::-1],
+                       den_mat=self.den_mat, tsr_mode=self.tsr_mode)
+        layer._compile_apply_gates()
+        layer.requires_grad = self.requires_grad
         for gate in self.gates[::-1]:
-            gates.append(gate.inverse())
-        layer.gates = gates
-        layer.wires = self.wires[::-1]
+            layer.gates.append(gate.inverse())
+        layer.npara = self.npara
         return layer
 
 
@@ -445,6 +691,22 @@ class CnotLayer(DoubleLayer):
             cnot = CNOT(nqubit=nqubit, wires=wire, den_mat=den_mat, tsr_mode=True)
             self.gates.append(cnot)
 
+    def forward(self, x: Union[torch.Tensor, MatrixProductState]) -> Union[torch.Tensor, MatrixProductState]:
+        """Perform a forward pass."""
+        if isinstance(x, MatrixProductState) or self.den_mat:
+            return super().forward(x)
+        if not self.tsr_mode:
+            x = self.tensor_rep(x)
+        # a CNOT only exchanges the target amplitudes in the control-1 subspace,
+        # so flip that slice instead of multiplying by the 4x4 matrix
+        for wire in self.wires:
+            control = wire[0] + 1
+            target = wire[1] + 1
+            x = torch.cat([x.narrow(control, 0, 1), x.narrow(control, 1, 1).flip(target)], dim=control)
+        if not self.tsr_mode:
+            return self.vector_rep(x).squeeze(0)
+        return x
+
     def inverse(self) -> 'CnotLayer':
         """Get the inversed layer."""
         wires = []
@@ -490,9 +752,5 @@ class CnotRing(CnotLayer):
         self.minmax = minmax
         self.step = step
         self.reverse = reverse
-        nwires = minmax[1] - minmax[0] + 1
-        if reverse: # from minmax[1] to minmax[0]
-            wires = [[minmax[0] + i, minmax[0] + (i-step) % nwires] for i in range(minmax[1] - minmax[0], -1, -1)]
-        else:
-            wires = [[minmax[0] + i, minmax[0] + (i+step) % nwires] for i in range(minmax[1] - minmax[0] + 1)]
+        wires = list(map(list, _ring_wires(minmax[0], minmax[1], step, reverse)))
         super().__init__(nqubit=nqubit, wires=wires, name='CnotRing', den_mat=den_mat, tsr_mode=tsr_mode)
@@ -418,13 +418,12 @@ class Layer(Operation):
 
     def get_unitary(self) -> torch.Tensor:
         """Get the global unitary matrix."""
-        u = None
-        for gate in self.gates:
-            if u is None:
-                u = gate.get_unitary()
-            else:
-                u = gate.get_unitary() @ u
-        return u
+        assert len(self.gates) > 0, 'There is no quantum gate'
+        # multiply the whole chain in one call, which builds a single autograd
+        # node with the optimal matrix-chain order instead of one node per gate
+        if len(self.gates) == 1:
+            return self.gates[0].get_unitary()
+        return torch.linalg.multi_dot([gate.get_unitary() for gate in reversed(self.gates)])
 
     def init_para(self, inputs: Any = None) -> None:
         """Initialize the parameters."""
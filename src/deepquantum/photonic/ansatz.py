@@ -2,7 +2,7 @@
 Ansatze: various photonic quantum circuits
 """
 
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import copy
 import networkx as nx
@@ -35,65 +35,56 @@ class Clements(QumodeCircuit):
         wires1 = self.wires[1::2]
         wires2 = self.wires[2::2]
         if not phi_first:
-            for wire in self.wires:
-                self.ps(wire, encode=True)
+            self.add_ps_batch(self.wires, encode=True)
+        pairs = []
         for i in range(nmode):
             if i % 2 == 0:
-                for j in range(len(wires1)):
-                    self.mzi([wires1[j] - 1, wires1[j]], phi_first=phi_first, encode=True)
+                pairs.extend([wires1[j] - 1, wires1[j]] for j in range(len(wires1)))
             else:
-                for j in range(len(wires2)):
-                    self.mzi([wires2[j] - 1, wires2[j]], phi_first=phi_first, encode=True)
+                pairs.extend([wires2[j] - 1, wires2[j]] for j in range(len(wires2)))
+        self.add_mzi_batch(pairs, phi_first=phi_first, encode=True)
         if phi_first:
-            for wire in self.wires:
-                self.ps(wire, encode=True)
+            self.add_ps_batch(self.wires, encode=True)
+        self._angle_keys = self._build_schedule()
 
-    def dict2data(self, angle_dict: Dict, dtype = torch.float) -> torch.Tensor:
-        """Convert the dictionary of angles to the input data for the circuit."""
-        angle_dict = angle_dict.copy()
-        for key in angle_dict.keys():
-            angle = angle_dict[key]
-            if not isinstance(angle, torch.Tensor):
-                angle = torch.tensor(angle)
-            angle_dict[key] = angle.reshape(-1)
-        data = []
-        columns = np.array([0] * self.nmode)
+    def _build_schedule(self) -> List[Tuple[int, int]]:
+        """Enumerate the ``(wire, column)`` keys of the angle dictionary in circuit order."""
+        keys = []
+        columns = [0] * self.nmode
         wires1 = self.wires[1::2]
         wires2 = self.wires[2::2]
         if not self.phi_first:
             for i in range(self.nmode):
-                data.append(angle_dict[(i, columns[i])])
+                keys.append((i, columns[i]))
                 columns[i] += 1
         for i in range(self.nmode):
             if i % 2 == 0:
-                for j in range(len(wires1)):
-                    wire = wires1[j] - 1
-                    if self.phi_first:
-                        phi   = angle_dict[(wire, columns[wire])]
-                        theta = angle_dict[(wire, columns[wire] + 1)]
-                    else:
-                        theta = angle_dict[(wire, columns[wire])]
-                        phi   = angle_dict[(wire, columns[wire] + 1)]
-                    data.append(theta)
-                    data.append(phi)
-                    columns[wire] += 2
+                wires = wires1
             else:
-                for j in range(len(wires2)):
-                    wire = wires2[j] - 1
-                    if self.phi_first:
-                        phi   = angle_dict[(wire, columns[wire])]
-                        theta = angle_dict[(wire, columns[wire] + 1)]
-                    else:
-                        theta = angle_dict[(wire, columns[wire])]
-                        phi   = angle_dict[(wire, columns[wire] + 1)]
-                    data.append(theta)
-                    data.append(phi)
-                    columns[wire] += 2
+                wires = wires2
+            for j in range(len(wires)):
+                wire = wires[j] - 1
+                if self.phi_first: # the angles are in the order of theta and phi
+                    keys.append((wire, columns[wire] + 1))
+                    keys.append((wire, columns[wire]))
+                else:
+                    keys.append((wire, columns[wire]))
+                    keys.append((wire, columns[wire] + 1))
+                columns[wire] += 2
         if self.phi_first:
             for i in range(self.nmode):
-                data.append(angle_dict[(i, columns[i])])
+                keys.append((i, columns[i]))
                 columns[i] += 1
-        return torch.cat(data).to(dtype)
+        return keys
+
+    def dict2data(self, angle_dict: Dict, dtype = torch.float) -> torch.Tensor:
+        """Convert the dictionary of angles to the input data for the circuit."""
+        # write each angle into a preallocated buffer instead of creating a
+        # one-element tensor per key and concatenating at the end
+        data = torch.empty(len(self._angle_keys), dtype=dtype)
+        for k, key in enumerate(self._angle_keys):
+            data[k] = angle_dict[key]
+        return data
 
 
 class GaussianBosonSampling(QumodeCircuit):
@@ -1272,6 +1272,63 @@ class QumodeCircuit(Operation):
                   requires_grad=requires_grad, noise=self.noise, mu=mu, sigma=sigma)
         self.add(mzi, encode=encode)
 
+    def add_mzi_batch(
+        self,
+        pairs: List[List[int]],
+        phi_first: bool = True,
+        encode: bool = False,
+        mu: Optional[float] = None,
+        sigma: Optional[float] = None
+    ) -> None:
+        """Add a batch of Mach-Zehnder interferometers and register them in one pass."""
+        requires_grad = not encode
+        if mu is None:
+            mu = self.mu
+        if sigma is None:
+            sigma = self.sigma
+        mzis = [MZI(nmode=self.nmode, wires=list(wires), cutoff=self.cutoff, phi_first=phi_first,
+                    requires_grad=requires_grad, noise=self.noise, mu=mu, sigma=sigma)
+                for wires in pairs]
+        npara = 0
+        for mzi in mzis:
+            self.operators.append(mzi)
+            for i in mzi.wires:
+                self.depth[i] += 1
+            npara += mzi.npara
+        if encode:
+            self.encoders.extend(mzis)
+            self.ndata += npara
+        else:
+            self.npara += npara
+
+    def add_ps_batch(
+        self,
+        wires: List[int],
+        encode: bool = False,
+        mu: Optional[float] = None,
+        sigma: Optional[float] = None
+    ) -> None:
+        """Add a batch of phase shifters and register them in one pass."""
+        requires_grad = not encode
+        if mu is None:
+            mu = self.mu
+        if sigma is None:
+            sigma = self.sigma
+        pss = [PhaseShift(nmode=self.nmode, wires=wire, cutoff=self.cutoff,
+                          requires_grad=requires_grad, noise=self.noise, mu=mu, sigma=sigma)
+               for wire in wires]
+        npara = 0
+        for ps in pss:
+            self.operators.append(ps)
+            for i in ps.wires:
+                self.depth[i] += 1
+            npara += ps.npara
+        if encode:
+            self.encoders.extend(pss)
+            self.ndata += npara
+        else:
+            self.npara += npara
+
     def bs_theta(
         self,
         wires: List[int],
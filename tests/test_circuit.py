@@ -40,3 +40,27 @@ def test_fock_mps():
     cir.bs([1,2], [0.3,0.4])
     state2 = cir().reshape(-1)
     assert torch.allclose(state1, state2, rtol=1e-5, atol=1e-5)
+
+
+def test_layer_double_precision():
+    nqubit = 3
+    cir = dq.QubitCircuit(nqubit)
+    cir.xlayer()
+    cir.ylayer()
+    cir.zlayer()
+    cir.hlayer()
+    cir.rxlayer()
+    cir.rylayer()
+    cir.rzlayer()
+    cir.u3layer()
+    cir.cnot_ring()
+    cir.observable(basis='z')
+    u1 = cir.get_unitary()
+    cir.to(torch.double)
+    state = cir()
+    assert state.dtype == torch.cdouble
+    u2 = cir.get_unitary()
+    assert u2.dtype == torch.cdouble
+    identity = torch.eye(2 ** nqubit, dtype=torch.cdouble)
+    assert torch.allclose(u2 @ u2.mH, identity, rtol=1e-12, atol=1e-12)
+    assert torch.allclose(u1.to(torch.cdouble), u2, rtol=1e-5, atol=1e-5)